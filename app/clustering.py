@@ -1,6 +1,7 @@
 """Face clustering module using DBSCAN algorithm for grouping similar faces."""
 
 import numpy as np
+from scipy.sparse import csr_matrix
 from sklearn.cluster import DBSCAN
 from typing import List, Dict
 import logging
@@ -10,6 +11,13 @@ from app.config import get_settings
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Above this many faces the dense N x N distance matrix gets too large to hold
+# in memory, so DBSCAN runs on a sparse graph of the pairs within eps instead.
+PRECOMPUTED_DISTANCE_MAX_FACES = 5000
+
+# Rows per block when building the sparse distance graph
+RADIUS_GRAPH_BLOCK_SIZE = 1024
+
 
 class FaceClustering:
     """
@@ -64,7 +72,7 @@ class FaceClustering:
         
         # Extract face IDs and embeddings
         face_ids = list(embeddings_dict.keys())
-        embeddings = np.array([embeddings_dict[fid] for fid in face_ids])
+        embeddings = np.array([embeddings_dict[fid] for fid in face_ids], dtype=np.float32)
         
         logger.info(f"Clustering {len(face_ids)} faces with eps={self.eps}, min_samples={self.min_samples}")
         
@@ -74,10 +82,13 @@ class FaceClustering:
         clustering = DBSCAN(
             eps=self.eps,
             min_samples=self.min_samples,
-            metric='cosine'
+            metric='precomputed'
         )
-        
-        labels = clustering.fit_predict(embeddings)
+        if len(face_ids) <= PRECOMPUTED_DISTANCE_MAX_FACES:
+            labels = clustering.fit_predict(self._cosine_distance_matrix(embeddings))
+        else:
+            graph = self._cosine_radius_graph(embeddings, self.eps, RADIUS_GRAPH_BLOCK_SIZE)
+            labels = clustering.fit_predict(graph)
         
         # Organize results by cluster
         clusters = {}
@@ -97,6 +108,76 @@ class FaceClustering:
         logger.info(f"Created {len(clusters)} clusters, {noise_count} noise faces")
         return clusters
     
+    @staticmethod
+    def _cosine_distance_matrix(embeddings: np.ndarray) -> np.ndarray:
+        """
+        Compute the pairwise cosine distance matrix with a single matrix product.
+        
+        Rows are L2-normalized in place, so cosine distance reduces to 1 - X @ X.T.
+        
+        Args:
+            embeddings (np.ndarray): Float32 array of shape (n_faces, embedding_dim).
+                Modified in place.
+            
+        Returns:
+            np.ndarray: Non-negative (n_faces, n_faces) distance matrix with a zero diagonal.
+        """
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        embeddings /= norms
+        
+        distances = embeddings @ embeddings.T
+        np.subtract(1.0, distances, out=distances)
+        # Rounding can push distances of (near-)identical vectors slightly below zero
+        np.clip(distances, 0.0, 2.0, out=distances)
+        np.fill_diagonal(distances, 0.0)
+        return distances
+    
+    @staticmethod
+    def _cosine_radius_graph(
+        embeddings: np.ndarray,
+        eps: float,
+        block_size: int = RADIUS_GRAPH_BLOCK_SIZE
+    ) -> csr_matrix:
+        """
+        Compute a sparse cosine distance graph holding only the pairs within eps.
+        
+        Distances are computed one block of rows at a time, so memory stays at
+        block_size x n_faces plus the kept edges. DBSCAN treats every stored entry
+        (explicit zeros included) as a neighbor, which gives the same labels as
+        the dense matrix.
+        
+        Args:
+            embeddings (np.ndarray): Float32 array of shape (n_faces, embedding_dim).
+                Modified in place.
+            eps (float): Maximum cosine distance of a kept pair.
+            block_size (int): Number of rows per distance block.
+            
+        Returns:
+            csr_matrix: (n_faces, n_faces) distances, with each face its own neighbor.
+        """
+        n_faces = len(embeddings)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        embeddings /= norms
+        
+        rows, cols, data = [], [], []
+        for start in range(0, n_faces, block_size):
+            distances = embeddings[start:start + block_size] @ embeddings.T
+            np.subtract(1.0, distances, out=distances)
+            block_rows = np.arange(len(distances))
+            distances[block_rows, start + block_rows] = 0.0
+            
+            r, c = np.nonzero(distances <= eps)
+            rows.append(r + start)
+            cols.append(c)
+            data.append(np.clip(distances[r, c], 0.0, 2.0))
+        
+        return csr_matrix(
+            (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(n_faces, n_faces)
+        )
+    
     def get_cluster_stats(self, clusters: Dict[int, List[int]]) -> Dict[str, float]:
         """
         Calculate statistical metrics about face clusters.
@@ -119,17 +200,26 @@ class FaceClustering:
             >>> stats = clusterer.get_cluster_stats(clusters)
             >>> print(f"Average cluster size: {stats['avg_cluster_size']:.1f}")
         """
-        total_clusters = len(clusters)
-        total_faces_clustered = sum(len(faces) for faces in clusters.values())
+        if not clusters:
+            return {
+                'total_clusters': 0,
+                'total_faces_clustered': 0,
+                'min_cluster_size': 0,
+                'max_cluster_size': 0,
+                'avg_cluster_size': 0.0
+            }
         
-        cluster_sizes = [len(faces) for faces in clusters.values()]
+        # Materialize cluster sizes once and reduce in numpy
+        cluster_sizes = np.fromiter(
+            map(len, clusters.values()), dtype=np.int32, count=len(clusters)
+        )
         
         stats = {
-            'total_clusters': total_clusters,
-            'total_faces_clustered': total_faces_clustered,
-            'min_cluster_size': min(cluster_sizes) if cluster_sizes else 0,
-            'max_cluster_size': max(cluster_sizes) if cluster_sizes else 0,
-            'avg_cluster_size': float(np.mean(cluster_sizes)) if cluster_sizes else 0.0
+            'total_clusters': int(cluster_sizes.size),
+            'total_faces_clustered': int(cluster_sizes.sum()),
+            'min_cluster_size': int(cluster_sizes.min()),
+            'max_cluster_size': int(cluster_sizes.max()),
+            'avg_cluster_size': float(cluster_sizes.mean())
         }
         
         logger.debug(f"Cluster stats: {stats}")
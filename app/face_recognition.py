@@ -2,7 +2,7 @@
 
 import numpy as np
 from deepface import DeepFace
-from typing import List, Optional, Dict, Tuple
+from typing import List, Optional, Dict, Sequence, Tuple
 import pickle
 import logging
 
@@ -155,16 +155,79 @@ class FaceRecognizer:
             >>> for face_id, score in matches[:5]:
             ...     print(f"Face {face_id}: {score:.2f}")
         """
-        similarities = []
+        if not embeddings_dict:
+            logger.info(f"Found 0 similar faces above threshold {threshold}")
+            return []
         
-        for face_id, embedding in embeddings_dict.items():
-            similarity = self.calculate_similarity(query_embedding, embedding)
+        face_ids = list(embeddings_dict.keys())
+        embeddings = list(embeddings_dict.values())
+        query = np.asarray(query_embedding, dtype=np.float32)
+        
+        # Stack embeddings into one (N, D) float32 matrix so every similarity
+        # comes out of a single matrix-vector product
+        try:
+            scores = np.stack(embeddings).astype(np.float32, copy=False) @ query
+        except ValueError:
+            # Some stored embeddings have a different dimension: score those 0.0,
+            # as calculate_similarity does, and the rest in one product
+            logger.warning("Embeddings with mismatched dimensions found; scoring them 0.0")
+            scores = np.zeros(len(embeddings), dtype=np.float32)
+            valid = [i for i, e in enumerate(embeddings) if np.shape(e) == query.shape]
+            if valid:
+                matrix = np.stack([embeddings[i] for i in valid]).astype(np.float32, copy=False)
+                scores[valid] = matrix @ query
+        
+        keep = np.flatnonzero(scores >= threshold)
+        # Sort by similarity (highest first); stable to keep insertion order on ties
+        order = keep[np.argsort(-scores[keep], kind="stable")]
+        similarities = [(face_ids[i], float(scores[i])) for i in order]
+        
+        logger.info(f"Found {len(similarities)} similar faces above threshold {threshold}")
+        return similarities
+    
+    def find_similar_faces_batched(
+        self,
+        query_embedding: np.ndarray,
+        embeddings: np.ndarray,
+        face_ids: Sequence[int],
+        threshold: float = 0.4,
+        k: int = 50
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the top-k faces similar to a query in a pre-stacked embedding matrix.
+        
+        Same scoring as find_similar_faces, but callers that search repeatedly can
+        stack the (N, D) matrix once, and only the k best candidates are sorted
+        (np.argpartition) instead of every match above the threshold.
+        
+        Args:
+            query_embedding (np.ndarray): Query face embedding to match.
+            embeddings (np.ndarray): Embedding matrix of shape (n_faces, embedding_dim).
+            face_ids (Sequence[int]): Face IDs for the rows of ``embeddings``.
+            threshold (float): Minimum similarity score to include in results (default: 0.4).
+            k (int): Maximum number of matches to return (default: 50).
             
-            if similarity >= threshold:
-                similarities.append((face_id, similarity))
+        Returns:
+            List[Tuple[int, float]]: Up to k (face_id, similarity_score) tuples,
+                sorted by similarity in descending order.
+                
+        Example:
+            >>> matrix = np.stack(list(all_embeddings.values()))
+            >>> matches = recognizer.find_similar_faces_batched(query_emb, matrix, list(all_embeddings), k=10)
+        """
+        if len(face_ids) == 0 or k <= 0:
+            logger.info(f"Found 0 similar faces above threshold {threshold}")
+            return []
         
-        # Sort by similarity (highest first)
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        scores = np.asarray(embeddings, dtype=np.float32) @ np.asarray(query_embedding, dtype=np.float32)
+        
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[scores[candidates] >= threshold]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        similarities = [(face_ids[i], float(scores[i])) for i in order]
         
         logger.info(f"Found {len(similarities)} similar faces above threshold {threshold}")
         return similarities
@@ -174,25 +237,30 @@ class FaceRecognizer:
         """
         Serialize a face embedding to bytes for database storage.
         
+        The embedding is stored as its raw float32 buffer (4 bytes per dimension),
+        which is both smaller and much faster to encode than a pickle.
+        
         Args:
             embedding (np.ndarray): Face embedding vector to serialize.
             
         Returns:
-            bytes: Pickled embedding data.
+            bytes: Raw float32 embedding data.
             
         Example:
             >>> embedding_bytes = FaceRecognizer.serialize_embedding(embedding)
             >>> # Store embedding_bytes in database
         """
-        return pickle.dumps(embedding)
+        return np.ascontiguousarray(embedding, dtype=np.float32).tobytes()
     
     @staticmethod
     def deserialize_embedding(embedding_bytes: bytes) -> np.ndarray:
         """
         Deserialize a face embedding from bytes retrieved from database.
         
+        Embeddings stored by older versions as pickled arrays are still accepted.
+        
         Args:
-            embedding_bytes (bytes): Pickled embedding data.
+            embedding_bytes (bytes): Raw float32 (or legacy pickled) embedding data.
             
         Returns:
             np.ndarray: Reconstructed face embedding vector.
@@ -201,4 +269,17 @@ class FaceRecognizer:
             >>> embedding = FaceRecognizer.deserialize_embedding(db_bytes)
             >>> print(f"Embedding shape: {embedding.shape}")
         """
-        return pickle.loads(embedding_bytes)
+        if _is_legacy_pickle(embedding_bytes):
+            try:
+                return np.asarray(pickle.loads(embedding_bytes))
+            except Exception:
+                logger.debug("Embedding looked pickled but failed to unpickle; reading as float32")
+        
+        return np.frombuffer(embedding_bytes, dtype=np.float32).copy()
+
+
+def _is_legacy_pickle(data: bytes) -> bool:
+    """Return True if data looks like an embedding pickled by older versions."""
+    # Raw float32 data is always a multiple of 4 bytes; pickles (protocol 2+)
+    # start with PROTO (0x80) and always end with STOP ('.')
+    return len(data) % 4 != 0 or (data[:1] == b"\x80" and data[-1:] == b".")
@@ -148,7 +148,7 @@ async def search_similar_faces(
     
     matches = []
     for face in all_faces:
-        face_embedding = np.array(face.embedding)
+        face_embedding = np.asarray(face.embedding, dtype=np.float32)
         
         # Compute cosine similarity
         similarity = float(np.dot(query_embedding, face_embedding) / 
@@ -423,8 +423,8 @@ async def cluster_faces_endpoint(
     embeddings_dict = {}
     for face in faces:
         if face.embedding:
-            # Convert JSON array back to numpy array
-            embeddings_dict[face.id] = np.array(face.embedding)
+            # Convert JSON array back to a float32 numpy array
+            embeddings_dict[face.id] = np.asarray(face.embedding, dtype=np.float32)
     
     # Perform clustering
     clusters = clusterer.cluster_faces(embeddings_dict)
@@ -8,15 +8,30 @@ This module provides:
 - Mock data generators
 """
 import pytest
+import pytest_asyncio
+import httpx
 import os
+import sys
 import tempfile
 import shutil
+import zlib
+import pathlib
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 import numpy as np
 from PIL import Image
 import io
+from unittest.mock import MagicMock
+
+# With SIETCH_FAST_TESTS=1, replace the heavy model packages with MagicMocks
+# before any app module imports them, so no RetinaFace/ArcFace weights or
+# TensorFlow sessions are loaded. This has to happen at conftest import time:
+# a session fixture would run after the app modules were already imported.
+if os.getenv("SIETCH_FAST_TESTS"):
+    for _module_name in ("retinaface", "deepface"):
+        sys.modules.setdefault(_module_name, MagicMock())
 
 # Import based on what's available
 try:
@@ -35,8 +50,13 @@ except ImportError:
 
 from app.config import get_settings
 
-# Test database URL
-TEST_DATABASE_URL = "sqlite:///./test.db"
+# Test database URL (in-memory by default, so every pytest-xdist worker process
+# has its own DB). Set TEST_DATABASE_URL to run against Postgres/MySQL instead.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "sqlite:///:memory:")
+TEST_DATABASE_IS_SQLITE = TEST_DATABASE_URL.startswith("sqlite")
+
+# Pool size for server-backed test databases; sized for the concurrency tests
+TEST_POOL_SIZE = 10
 
 
 @pytest.fixture(scope="session")
@@ -48,60 +68,226 @@ def test_settings():
     return settings
 
 
-@pytest.fixture(scope="function")
-def test_db_engine():
-    """Create a test database engine."""
-    engine = create_engine(
-        TEST_DATABASE_URL,
-        connect_args={"check_same_thread": False}
-    )
+def _create_schema(engine):
+    """Create all tables, yield the engine, then drop them and dispose it."""
+    if CORE_API_AVAILABLE:
+        CoreBase.metadata.create_all(bind=engine)
+    if MAIN_API_AVAILABLE:
+        MainBase.metadata.create_all(bind=engine)
+    
     yield engine
+    
+    if CORE_API_AVAILABLE:
+        CoreBase.metadata.drop_all(bind=engine)
+    if MAIN_API_AVAILABLE:
+        MainBase.metadata.drop_all(bind=engine)
     engine.dispose()
 
 
-@pytest.fixture(scope="function")
-def test_db_session(test_db_engine):
-    """Create a test database session."""
-    TestingSessionLocal = sessionmaker(
-        autocommit=False,
-        autoflush=False,
-        bind=test_db_engine
+@pytest.fixture(scope="session")
+def test_db_engine():
+    """
+    Create the test database engine and schema once per session.
+    
+    StaticPool hands out the same connection every time, so the in-memory
+    database (and its schema) lives for the whole session. Server-backed
+    databases get a pool large enough for the concurrency tests, with
+    pre-ping so stale connections are replaced instead of failing a test.
+    """
+    if not TEST_DATABASE_IS_SQLITE:
+        engine = create_engine(
+            TEST_DATABASE_URL,
+            pool_size=TEST_POOL_SIZE,
+            max_overflow=2 * TEST_POOL_SIZE,
+            pool_pre_ping=True,
+            pool_recycle=300
+        )
+        yield from _create_schema(engine)
+        return
+    
+    engine = create_engine(
+        TEST_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
     )
     
-    # Create tables
-    if CORE_API_AVAILABLE:
-        CoreBase.metadata.create_all(bind=test_db_engine)
-    if MAIN_API_AVAILABLE:
-        MainBase.metadata.create_all(bind=test_db_engine)
+    # pysqlite handles BEGIN itself and breaks SAVEPOINT support, so let
+    # SQLAlchemy emit BEGIN explicitly (see SQLAlchemy's SQLite dialect docs).
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+    
+    # Nothing here needs durability: keep the journal and temp tables in
+    # memory and never fsync on commit. Test engine only; the app engine
+    # keeps SQLite's durable defaults.
+    @event.listens_for(engine, "connect")
+    def _fast_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+    
+    yield from _create_schema(engine)
+
+
+def _isolated_session(engine, **options):
+    """Yield a session joined to an outer transaction that is rolled back afterwards."""
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint", **options)
     
-    session = TestingSessionLocal()
     yield session
     
     session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="function")
+def test_db_session(test_db_engine):
+    """
+    Create a test database session isolated in a transaction.
     
-    # Drop tables
-    if CORE_API_AVAILABLE:
-        CoreBase.metadata.drop_all(bind=test_db_engine)
-    if MAIN_API_AVAILABLE:
-        MainBase.metadata.drop_all(bind=test_db_engine)
+    The session joins an outer transaction that is rolled back after the test,
+    so commits made by the test or by the API only release a SAVEPOINT and
+    nothing persists between tests. The Core API's get_db dependency is
+    overridden to use this session for the duration of the test.
+    """
+    for session in _isolated_session(test_db_engine, autoflush=False):
+        if CORE_API_AVAILABLE:
+            def override_get_db():
+                yield session
+            
+            core_app.dependency_overrides[get_core_db] = override_get_db
+        
+        yield session
+        
+        if CORE_API_AVAILABLE:
+            core_app.dependency_overrides.pop(get_core_db, None)
 
 
 @pytest.fixture(scope="function")
-def core_client(test_db_session):
-    """Create a test client for Core API."""
+def model_db_session(test_db_engine):
+    """
+    Create an isolated session for model tests that never go through the API.
+    
+    Objects are not expired on commit, so reading attributes right after a
+    commit does not reload them; call ``session.refresh(obj)`` when a test
+    needs values the database computed on update.
+    """
+    yield from _isolated_session(test_db_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture(autouse=True)
+def _core_api_db_isolation(request):
+    """Give every test that talks to the Core API its own rolled-back DB session."""
+    if "core_client" in request.fixturenames or "async_client" in request.fixturenames:
+        request.getfixturevalue("test_db_session")
+
+
+def _bulk_persons(session, n):
+    """Insert ``n`` persons in one executemany, skipping ORM instantiation."""
+    from app.models_core import Person
+
+    session.bulk_insert_mappings(Person, [{"name": f"Person {i:03d}"} for i in range(n)])
+    session.commit()
+
+
+def _face_rows(n, person_id=None):
+    """Row dicts for ``n`` faces (optionally owned by ``person_id``)."""
+    return [
+        {
+            "image_path": f"/path/{i}.jpg",
+            "bbox_x": i * 10, "bbox_y": i * 10, "bbox_width": 100, "bbox_height": 100,
+            "confidence": 0.9,
+            "embedding": [float(i)] * 512,
+            "person_id": person_id,
+        }
+        for i in range(n)
+    ]
+
+
+def _bulk_faces(session, n, person_id=None):
+    """Insert ``n`` faces (optionally owned by ``person_id``) in one executemany."""
+    from app.models_core import Face
+
+    session.bulk_insert_mappings(Face, _face_rows(n, person_id))
+    session.commit()
+
+
+@pytest.fixture
+def bulk_persons(test_db_session):
+    """Seed persons into the test session: ``bulk_persons(n)``."""
+    return lambda n: _bulk_persons(test_db_session, n)
+
+
+@pytest.fixture(scope="session")
+def face_rows():
+    """Build face row dicts for Core inserts: ``face_rows(n, person_id=None)``."""
+    return _face_rows
+
+
+@pytest.fixture
+def bulk_faces(test_db_session):
+    """Seed faces into the test session: ``bulk_faces(n, person_id=None)``."""
+    return lambda n, person_id=None: _bulk_faces(test_db_session, n, person_id)
+
+
+_FACE_DEFAULTS = dict(
+    image_path="/path/to/image.jpg",
+    bbox_x=100, bbox_y=100, bbox_width=200, bbox_height=200,
+    confidence=0.95,
+    embedding=[0.1] * 512,
+)
+
+
+@pytest.fixture
+def make_face(model_db_session):
+    """Create and commit a Face with sensible defaults: ``make_face(**overrides)``."""
+    from app.models_core import Face
+    
+    def _make_face(**overrides):
+        face = Face(**{**_FACE_DEFAULTS, **overrides})
+        model_db_session.add(face)
+        model_db_session.commit()
+        return face
+    
+    return _make_face
+
+
+@pytest.fixture(scope="session")
+def core_client(test_db_engine):
+    """
+    Create a test client for Core API shared by the whole session.
+    
+    Entering the client runs the app's startup handlers once for the session
+    and keeps the in-process transport open for every test. The startup
+    init_db() is replaced with a no-op: test_db_engine already created the
+    schema, and the real one would create tables at settings.database_url.
+    """
     if not CORE_API_AVAILABLE:
         pytest.skip("Core API not available")
     
-    def override_get_db():
-        try:
-            yield test_db_session
-        finally:
-            pass
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.main_core.init_db", lambda: None)
+        with TestClient(core_app) as client:
+            yield client
+
+
+@pytest_asyncio.fixture(scope="function")
+async def async_client():
+    """Create an async HTTP client for Core API bound to the ASGI app in-process."""
+    if not CORE_API_AVAILABLE:
+        pytest.skip("Core API not available")
     
-    core_app.dependency_overrides[get_core_db] = override_get_db
-    client = TestClient(core_app)
-    yield client
-    core_app.dependency_overrides.clear()
+    transport = httpx.ASGITransport(app=core_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
 
 
 @pytest.fixture(scope="function")
@@ -130,9 +316,9 @@ def temp_upload_dir():
     shutil.rmtree(temp_dir, ignore_errors=True)
 
 
-@pytest.fixture
-def sample_face_image():
-    """Create a sample face image for testing."""
+@pytest.fixture(scope="session")
+def sample_face_image_bytes():
+    """Encoded JPEG bytes of a sample face image, drawn and encoded once per session."""
     # Create a simple 200x200 RGB image
     img = Image.new('RGB', (200, 200), color='white')
     
@@ -153,27 +339,24 @@ def sample_face_image():
     # Convert to bytes
     img_bytes = io.BytesIO()
     img.save(img_bytes, format='JPEG')
-    img_bytes.seek(0)
-    
-    return img_bytes
+    return img_bytes.getvalue()
 
 
 @pytest.fixture
-def sample_face_image_path(sample_face_image, temp_upload_dir):
-    """Save sample face image to a temporary file."""
-    file_path = os.path.join(temp_upload_dir, "test_face.jpg")
-    
-    with open(file_path, 'wb') as f:
-        f.write(sample_face_image.read())
-    
-    yield file_path
-    
-    # Cleanup
-    if os.path.exists(file_path):
-        os.remove(file_path)
+def sample_face_image(sample_face_image_bytes):
+    """Create a sample face image for testing."""
+    return io.BytesIO(sample_face_image_bytes)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
+def sample_face_image_path(sample_face_image_bytes, tmp_path_factory):
+    """Save sample face image to a temporary file once per session."""
+    file_path = tmp_path_factory.mktemp("faces") / "test_face.jpg"
+    file_path.write_bytes(sample_face_image_bytes)
+    return str(file_path)
+
+
+@pytest.fixture(scope="session")
 def multiple_face_images(temp_upload_dir):
     """Create multiple test face images."""
     image_paths = []
@@ -201,26 +384,76 @@ def multiple_face_images(temp_upload_dir):
             os.remove(path)
 
 
+@pytest.fixture(scope="session")
+def multiple_face_payloads(multiple_face_images):
+    """Read the multiple test face images into memory once as (filename, bytes) pairs."""
+    return [
+        (f"image_{i}.jpg", pathlib.Path(path).read_bytes())
+        for i, path in enumerate(multiple_face_images)
+    ]
+
+
+@pytest.fixture(scope="session")
+def detector():
+    """Create a single FaceDetector shared by the whole test session."""
+    from app.face_detection import FaceDetector
+    return FaceDetector()
+
+
+@pytest.fixture(scope="session")
+def recognizer():
+    """Create a single FaceRecognizer shared by the whole test session."""
+    from app.face_recognition import FaceRecognizer
+    return FaceRecognizer()
+
+
 @pytest.fixture
+def rng(request):
+    """
+    NumPy random generator (SFC64) seeded from the test's node id.
+    
+    Each test gets its own stream, so the values it draws do not depend on
+    which tests ran before it (ordering, ``-k``, ``--ff`` or xdist workers).
+    """
+    return np.random.Generator(np.random.SFC64(zlib.crc32(request.node.nodeid.encode())))
+
+
+@pytest.fixture(scope="session")
 def sample_embedding():
-    """Create a sample 512-dimensional face embedding."""
-    embedding = np.random.randn(512).astype(np.float32)
-    # Normalize the embedding
-    embedding = embedding / np.linalg.norm(embedding)
+    """Create a sample 512-dimensional normalized float32 face embedding (read-only)."""
+    rng = np.random.default_rng(0)
+    embedding = rng.standard_normal(512, dtype=np.float32)
+    embedding /= np.linalg.norm(embedding)
+    embedding.flags.writeable = False
     return embedding
 
 
-@pytest.fixture
-def sample_embeddings_dict():
-    """Create a dictionary of sample embeddings for testing."""
-    embeddings = {}
-    for i in range(10):
-        embedding = np.random.randn(512).astype(np.float32)
-        embedding = embedding / np.linalg.norm(embedding)
-        embeddings[i] = embedding
+@pytest.fixture(scope="session")
+def sample_embeddings_matrix():
+    """Create a (10, 512) C-contiguous float32 matrix of normalized embeddings (read-only)."""
+    rng = np.random.default_rng(1)
+    embeddings = rng.standard_normal((10, 512), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings.flags.writeable = False
     return embeddings
 
 
+@pytest.fixture(scope="session")
+def emb_pool():
+    """Create a (10000, 512) float32 pool of normalized embeddings for benchmarks (read-only; slice views)."""
+    rng = np.random.default_rng(2)
+    pool = rng.standard_normal((10000, 512), dtype=np.float32)
+    pool /= np.linalg.norm(pool, axis=1, keepdims=True)
+    pool.flags.writeable = False
+    return pool
+
+
+@pytest.fixture
+def sample_embeddings_dict(sample_embeddings_matrix):
+    """Create a dictionary of sample embeddings for testing (fresh dict of row views per test)."""
+    return dict(enumerate(sample_embeddings_matrix))
+
+
 @pytest.fixture
 def api_headers(test_settings):
     """Create API headers with authentication."""
@@ -229,6 +462,38 @@ def api_headers(test_settings):
     }
 
 
+@pytest.fixture
+def mock_retinaface(monkeypatch):
+    """Replace RetinaFace.detect_faces with a MagicMock for the duration of a test."""
+    mock = MagicMock()
+    monkeypatch.setattr("app.face_detection.RetinaFace.detect_faces", mock)
+    return mock
+
+
+@pytest.fixture
+def mock_deepface_represent(monkeypatch):
+    """Replace DeepFace.represent with a MagicMock for the duration of a test."""
+    mock = MagicMock()
+    monkeypatch.setattr("app.face_recognition.DeepFace.represent", mock)
+    return mock
+
+
+@pytest.fixture
+def mock_cv2_imread(monkeypatch):
+    """Replace cv2.imread with a MagicMock for the duration of a test."""
+    mock = MagicMock()
+    monkeypatch.setattr("cv2.imread", mock)
+    return mock
+
+
+@pytest.fixture
+def mock_cv2_imwrite(monkeypatch):
+    """Replace cv2.imwrite with a MagicMock for the duration of a test."""
+    mock = MagicMock()
+    monkeypatch.setattr("cv2.imwrite", mock)
+    return mock
+
+
 @pytest.fixture
 def mock_face_data():
     """Create mock face detection data."""
@@ -267,11 +532,23 @@ def mock_multiple_faces():
     ]
 
 
-# Cleanup after all tests
-def pytest_sessionfinish(session, exitstatus):
-    """Clean up test database after all tests."""
-    if os.path.exists("./test.db"):
-        try:
-            os.remove("./test.db")
-        except:
-            pass
+def pytest_addoption(parser):
+    """Register the --run-integration opt-in."""
+    parser.addoption(
+        "--run-integration",
+        action="store_true",
+        default=False,
+        help="run tests marked integration (skipped by default)"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip integration tests unless --run-integration is given."""
+    if config.getoption("--run-integration"):
+        return
+    
+    skip_integration = pytest.mark.skip(reason="integration test: pass --run-integration to run")
+    for item in items:
+        if "integration" in item.keywords:
+            item.add_marker(skip_integration)
+
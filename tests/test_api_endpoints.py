@@ -47,7 +47,8 @@ class TestCoreAPIEndpoints:
     
     @patch('app.routes.core.detector.detect_faces')
     @patch('app.routes.core.recognizer.generate_embedding')
-    def test_detect_faces_endpoint(self, mock_embedding, mock_detect, core_client, sample_face_image):
+    def test_detect_faces_endpoint(self, mock_embedding, mock_detect, core_client, sample_face_image,
+                                   sample_embedding):
         """Test face detection endpoint."""
         # Mock face detection
         mock_detect.return_value = [{
@@ -57,8 +58,7 @@ class TestCoreAPIEndpoints:
         }]
         
         # Mock embedding generation
-        import numpy as np
-        mock_embedding.return_value = np.random.randn(512)
+        mock_embedding.return_value = sample_embedding
         
         # Prepare file upload
         files = {"file": ("test.jpg", sample_face_image, "image/jpeg")}
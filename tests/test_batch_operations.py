@@ -10,15 +10,16 @@ Batch operations to test:
 - Batch similarity search
 - Bulk delete operations
 """
+import importlib.util
+import io
+
 import pytest
 from unittest.mock import patch
 import numpy as np
 
-try:
-    from app.models_core import Person, Face
-    CORE_MODELS_AVAILABLE = True
-except ImportError:
-    CORE_MODELS_AVAILABLE = False
+# Only probe for the module here; the models are imported inside the tests
+# that need them so collection never executes app.models_core.
+CORE_MODELS_AVAILABLE = importlib.util.find_spec("app.models_core") is not None
 
 
 @pytest.mark.integration
@@ -27,18 +28,18 @@ except ImportError:
 class TestBatchDetection:
     """Test suite for batch face detection (future feature)."""
     
-    def test_batch_detect_multiple_images(self, core_client, multiple_face_images):
+    def test_batch_detect_multiple_images(self, core_client, multiple_face_payloads):
         """Test detecting faces in multiple images at once."""
         # When batch endpoint is implemented
-        files = [("files", (f"image_{i}.jpg", open(path, "rb"), "image/jpeg")) 
-                 for i, path in enumerate(multiple_face_images)]
+        files = [("files", (name, io.BytesIO(data), "image/jpeg"))
+                 for name, data in multiple_face_payloads]
         
         response = core_client.post("/batch/detect", files=files)
         
         assert response.status_code == 200
         data = response.json()
         assert "results" in data
-        assert len(data["results"]) == len(multiple_face_images)
+        assert len(data["results"]) == len(multiple_face_payloads)
     
     def test_batch_detect_empty_list(self, core_client):
         """Test batch detection with no images."""
@@ -46,10 +47,10 @@ class TestBatchDetection:
         
         assert response.status_code in [200, 400, 422]
     
-    def test_batch_detect_mixed_valid_invalid(self, core_client, sample_face_image):
+    def test_batch_detect_mixed_valid_invalid(self, core_client, multiple_face_payloads):
         """Test batch detection with mix of valid and invalid files."""
-        import io
-        valid_file = ("files", ("valid.jpg", sample_face_image, "image/jpeg"))
+        _, valid_bytes = multiple_face_payloads[0]
+        valid_file = ("files", ("valid.jpg", io.BytesIO(valid_bytes), "image/jpeg"))
         invalid_file = ("files", ("invalid.txt", io.BytesIO(b"text"), "text/plain"))
         
         response = core_client.post("/batch/detect", files=[valid_file, invalid_file])
@@ -78,6 +79,8 @@ class TestBatchPersonOperations:
     
     def test_batch_update_persons(self, core_client, test_db_session):
         """Test updating multiple persons at once."""
+        from app.models_core import Person
+        
         # Create test persons
         persons = [Person(name=f"Person {i}") for i in range(5)]
         test_db_session.add_all(persons)
@@ -94,6 +97,8 @@ class TestBatchPersonOperations:
     
     def test_batch_delete_persons(self, core_client, test_db_session):
         """Test deleting multiple persons at once."""
+        from app.models_core import Person
+        
         # Create test persons
         persons = [Person(name=f"Person {i}") for i in range(5)]
         test_db_session.add_all(persons)
@@ -114,6 +119,8 @@ class TestBatchSimilaritySearch:
     
     def test_batch_similarity_search(self, core_client, test_db_session):
         """Test searching for similar faces for multiple queries."""
+        from app.models_core import Face
+        
         # Create test faces
         for i in range(10):
             face = Face(
@@ -147,6 +154,8 @@ class TestBatchFaceOperations:
     
     def test_batch_assign_faces_to_person(self, core_client, test_db_session):
         """Test assigning multiple faces to a person at once."""
+        from app.models_core import Person, Face
+        
         person = Person(name="Test Person")
         test_db_session.add(person)
         test_db_session.commit()
@@ -174,6 +183,8 @@ class TestBatchFaceOperations:
     
     def test_batch_delete_faces(self, core_client, test_db_session):
         """Test deleting multiple faces at once."""
+        from app.models_core import Face
+        
         faces = [
             Face(
                 image_path=f"/path/{i}.jpg",
@@ -198,22 +209,21 @@ class TestBatchFaceOperations:
 class TestBatchPerformance:
     """Performance tests for batch operations (future feature)."""
     
-    def test_batch_detection_performance(self, core_client, multiple_face_images):
+    def test_batch_detection_performance(self, core_client, multiple_face_payloads):
         """Test that batch detection is faster than individual requests."""
         import time
         
         # Individual requests
         start = time.time()
-        for img_path in multiple_face_images:
-            with open(img_path, "rb") as f:
-                files = {"file": ("test.jpg", f, "image/jpeg")}
-                core_client.post("/detect", files=files)
+        for name, data in multiple_face_payloads:
+            files = {"file": (name, io.BytesIO(data), "image/jpeg")}
+            core_client.post("/detect", files=files)
         individual_time = time.time() - start
         
         # Batch request
         start = time.time()
-        files = [("files", (f"img_{i}.jpg", open(path, "rb"), "image/jpeg"))
-                 for i, path in enumerate(multiple_face_images)]
+        files = [("files", (name, io.BytesIO(data), "image/jpeg"))
+                 for name, data in multiple_face_payloads]
         core_client.post("/batch/detect", files=files)
         batch_time = time.time() - start
         
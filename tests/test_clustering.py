@@ -8,11 +8,34 @@ Tests the FaceClustering class including:
 """
 import pytest
 import numpy as np
-from unittest.mock import patch
+from functools import cache
 
 from app.clustering import FaceClustering
 
 
+@cache
+def _unit(seed: int = 0, dim: int = 512) -> np.ndarray:
+    """Return a cached, read-only unit-norm float32 vector for the given seed."""
+    v = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    v /= np.linalg.norm(v)
+    v.flags.writeable = False
+    return v
+
+
+_RNG = np.random.default_rng(0)
+_SCRATCH = np.empty((64, 512), dtype=np.float32)
+
+
+def _jitter(base: np.ndarray, k: int, scale: float = 0.01) -> np.ndarray:
+    """Return k unit-norm copies of base perturbed by Gaussian noise of the given scale."""
+    buf = _SCRATCH[:k]
+    _RNG.standard_normal(dtype=np.float32, out=buf)
+    np.multiply(buf, scale, out=buf)
+    np.add(buf, base, out=buf)
+    buf /= np.linalg.norm(buf, axis=1, keepdims=True)
+    return buf.copy()
+
+
 @pytest.mark.unit
 class TestFaceClustering:
     """Test suite for FaceClustering class."""
@@ -41,8 +64,7 @@ class TestFaceClustering:
     
     def test_cluster_faces_single_face(self):
         """Test clustering with a single face."""
-        embedding = np.random.randn(512).astype(np.float32)
-        embedding = embedding / np.linalg.norm(embedding)
+        embedding = _unit()
         
         clusterer = FaceClustering()
         clusters = clusterer.cluster_faces({1: embedding})
@@ -52,11 +74,13 @@ class TestFaceClustering:
     
     def test_cluster_faces_identical_embeddings(self):
         """Test clustering with identical embeddings."""
-        embedding = np.random.randn(512).astype(np.float32)
-        embedding = embedding / np.linalg.norm(embedding)
+        embedding = _unit()
         
-        # Create multiple identical embeddings
-        embeddings_dict = {i: embedding.copy() for i in range(5)}
+        # Create multiple identical embeddings as rows of a read-only view,
+        # so any in-place write by the clusterer raises instead of passing silently
+        X = np.broadcast_to(embedding, (5, 512))
+        X.flags.writeable = False
+        embeddings_dict = {i: X[i] for i in range(5)}
         
         clusterer = FaceClustering()
         clusterer.eps = 0.01  # Very small eps for identical embeddings
@@ -67,31 +91,23 @@ class TestFaceClustering:
         assert len(clusters) == 1
         cluster_faces = list(clusters.values())[0]
         assert len(cluster_faces) == 5
+        # Inputs must not be mutated
+        assert np.array_equal(X, np.broadcast_to(_unit(), (5, 512)))
     
     def test_cluster_faces_two_groups(self):
         """Test clustering with two distinct groups."""
         # Create two groups of similar embeddings
-        base_embedding1 = np.random.randn(512).astype(np.float32)
-        base_embedding1 = base_embedding1 / np.linalg.norm(base_embedding1)
-        
-        base_embedding2 = np.random.randn(512).astype(np.float32)
-        base_embedding2 = base_embedding2 / np.linalg.norm(base_embedding2)
+        base_embedding1 = _unit()
         
         # Make them very different
         base_embedding2 = -base_embedding1
         
         embeddings_dict = {}
         # Group 1
-        for i in range(3):
-            emb = base_embedding1 + np.random.randn(512) * 0.01
-            emb = emb / np.linalg.norm(emb)
-            embeddings_dict[i] = emb
+        embeddings_dict.update(zip(range(3), _jitter(base_embedding1, 3)))
         
         # Group 2
-        for i in range(3, 6):
-            emb = base_embedding2 + np.random.randn(512) * 0.01
-            emb = emb / np.linalg.norm(emb)
-            embeddings_dict[i] = emb
+        embeddings_dict.update(zip(range(3, 6), _jitter(base_embedding2, 3)))
         
         clusterer = FaceClustering()
         clusterer.eps = 0.3
@@ -101,24 +117,37 @@ class TestFaceClustering:
         # Should create two clusters
         assert len(clusters) >= 1  # At least one cluster should form
     
+    def test_cluster_faces_sparse_graph_matches_dense(self, monkeypatch):
+        """Test the sparse radius graph used for large inputs gives the dense labels."""
+        embeddings_dict = {}
+        embeddings_dict.update(zip(range(4), _jitter(_unit(1), 4)))
+        embeddings_dict.update(zip(range(4, 8), _jitter(_unit(2), 4)))
+        embeddings_dict[8] = _unit(3)
+        
+        clusterer = FaceClustering()
+        clusterer.eps = 0.3
+        clusterer.min_samples = 2
+        dense = clusterer.cluster_faces(embeddings_dict)
+        
+        monkeypatch.setattr("app.clustering.PRECOMPUTED_DISTANCE_MAX_FACES", 0)
+        monkeypatch.setattr("app.clustering.RADIUS_GRAPH_BLOCK_SIZE", 3)
+        sparse = clusterer.cluster_faces(embeddings_dict)
+        
+        assert sorted(map(sorted, sparse.values())) == sorted(map(sorted, dense.values()))
+        assert sorted(map(sorted, dense.values())) == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    
     def test_cluster_faces_with_noise(self):
         """Test clustering with noise points."""
         # Create similar embeddings for a cluster
-        base_embedding = np.random.randn(512).astype(np.float32)
-        base_embedding = base_embedding / np.linalg.norm(base_embedding)
+        base_embedding = _unit()
         
         embeddings_dict = {}
         # Cluster faces
-        for i in range(3):
-            emb = base_embedding + np.random.randn(512) * 0.01
-            emb = emb / np.linalg.norm(emb)
-            embeddings_dict[i] = emb
+        embeddings_dict.update(zip(range(3), _jitter(base_embedding, 3)))
         
         # Noise faces (very different)
         for i in range(3, 5):
-            emb = np.random.randn(512).astype(np.float32)
-            emb = emb / np.linalg.norm(emb)
-            embeddings_dict[i] = emb
+            embeddings_dict[i] = _unit(i)
         
         clusterer = FaceClustering()
         clusterer.eps = 0.1
@@ -175,13 +204,9 @@ class TestFaceClustering:
         embeddings_dict = {}
         face_ids = [10, 20, 30, 40, 50]
         
-        base_embedding = np.random.randn(512).astype(np.float32)
-        base_embedding = base_embedding / np.linalg.norm(base_embedding)
+        base_embedding = _unit()
         
-        for face_id in face_ids:
-            emb = base_embedding + np.random.randn(512) * 0.01
-            emb = emb / np.linalg.norm(emb)
-            embeddings_dict[face_id] = emb
+        embeddings_dict.update(zip(face_ids, _jitter(base_embedding, len(face_ids))))
         
         clusterer = FaceClustering()
         clusterer.eps = 0.3
@@ -199,9 +224,7 @@ class TestFaceClustering:
         
         # Create faces that will likely be noise
         for i in range(10):
-            emb = np.random.randn(512).astype(np.float32)
-            emb = emb / np.linalg.norm(emb)
-            embeddings_dict[i] = emb
+            embeddings_dict[i] = _unit(i + 1)
         
         clusterer = FaceClustering()
         clusterer.eps = 0.01  # Very small eps
@@ -213,14 +236,9 @@ class TestFaceClustering:
     
     def test_cluster_faces_with_varying_eps(self):
         """Test clustering behavior with different eps values."""
-        base_embedding = np.random.randn(512).astype(np.float32)
-        base_embedding = base_embedding / np.linalg.norm(base_embedding)
+        base_embedding = _unit()
         
-        embeddings_dict = {}
-        for i in range(5):
-            emb = base_embedding + np.random.randn(512) * 0.1
-            emb = emb / np.linalg.norm(emb)
-            embeddings_dict[i] = emb
+        embeddings_dict = dict(zip(range(5), _jitter(base_embedding, 5, scale=0.1)))
         
         clusterer = FaceClustering()
         clusterer.min_samples = 2
@@ -239,11 +257,7 @@ class TestFaceClustering:
     
     def test_cluster_faces_preserves_embedding_dict(self):
         """Test that clustering does not modify the input dictionary."""
-        embeddings_dict = {}
-        for i in range(5):
-            emb = np.random.randn(512).astype(np.float32)
-            emb = emb / np.linalg.norm(emb)
-            embeddings_dict[i] = emb
+        embeddings_dict = {i: _unit(i) for i in range(5)}
         
         original_keys = set(embeddings_dict.keys())
         original_len = len(embeddings_dict)
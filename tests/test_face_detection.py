@@ -9,131 +9,102 @@ Tests the FaceDetector class including:
 """
 import pytest
 import numpy as np
-from unittest.mock import Mock, patch, MagicMock
-import cv2
 
-from app.face_detection import FaceDetector
+
+# (RetinaFace response or exception to raise, expected face count, detector attribute overrides)
+DETECTION_CASES = [
+    pytest.param(
+        {
+            'face_1': {'facial_area': [50, 50, 150, 150], 'score': 0.95, 'landmarks': {}},
+            'face_2': {'facial_area': [200, 50, 300, 150], 'score': 0.92, 'landmarks': {}},
+        },
+        2, {}, id="multiple"
+    ),
+    pytest.param({}, 0, {}, id="no_faces"),
+    pytest.param(
+        {'face_1': {'facial_area': [50, 50, 150, 150], 'score': 0.5, 'landmarks': {}}},
+        0, {'confidence_threshold': 0.9}, id="below_confidence_threshold"
+    ),
+    pytest.param(
+        {'face_1': {'facial_area': [50, 50, 60, 60], 'score': 0.95, 'landmarks': {}}},  # 10x10 face
+        0, {'min_face_size': 20}, id="too_small"
+    ),
+    pytest.param(None, 0, {}, id="invalid_response"),
+    pytest.param(Exception("Detection failed"), 0, {}, id="exception"),
+    pytest.param(
+        {'face_1': {'score': 0.95, 'landmarks': {}}},
+        0, {}, id="missing_facial_area"
+    ),
+    pytest.param(
+        {'face_1': {'facial_area': [50, 50], 'score': 0.95, 'landmarks': {}}},  # Should be 4 values
+        0, {}, id="invalid_facial_area_format"
+    ),
+]
+
+
+@pytest.fixture(autouse=True)
+def _reset_detector(detector):
+    """Restore thresholds on the shared detector after tests that tweak them."""
+    old = (detector.confidence_threshold, detector.min_face_size)
+    yield
+    detector.confidence_threshold, detector.min_face_size = old
 
 
 @pytest.mark.unit
+@pytest.mark.xdist_group("face_detection")
 class TestFaceDetector:
     """Test suite for FaceDetector class."""
     
-    def test_init(self):
+    def test_init(self, detector):
         """Test FaceDetector initialization."""
-        detector = FaceDetector()
         assert detector.min_face_size > 0
         assert 0.0 <= detector.confidence_threshold <= 1.0
     
-    @patch('app.face_detection.RetinaFace.detect_faces')
-    def test_detect_faces_success(self, mock_detect, sample_face_image_path):
-        """Test successful face detection."""
+    def test_detect_faces_success(self, mock_retinaface, sample_face_image_path, detector):
+        """Test successful face detection with landmarks preserved."""
+        landmarks = {
+            'left_eye': [75, 85],
+            'right_eye': [125, 85],
+            'nose': [100, 100],
+            'mouth_left': [85, 115],
+            'mouth_right': [115, 115]
+        }
+        
         # Mock RetinaFace response
-        mock_detect.return_value = {
+        mock_retinaface.return_value = {
             'face_1': {
                 'facial_area': [50, 50, 150, 150],
                 'score': 0.95,
-                'landmarks': {}
+                'landmarks': landmarks
             }
         }
         
-        detector = FaceDetector()
         faces = detector.detect_faces(sample_face_image_path)
         
         assert len(faces) == 1
         assert faces[0]['score'] == 0.95
         assert faces[0]['facial_area'] == [50, 50, 100, 100]
-        mock_detect.assert_called_once_with(sample_face_image_path)
+        assert faces[0]['landmarks'] == landmarks
+        mock_retinaface.assert_called_once_with(sample_face_image_path)
     
-    @patch('app.face_detection.RetinaFace.detect_faces')
-    def test_detect_faces_multiple(self, mock_detect, sample_face_image_path):
-        """Test detection of multiple faces."""
-        mock_detect.return_value = {
-            'face_1': {
-                'facial_area': [50, 50, 150, 150],
-                'score': 0.95,
-                'landmarks': {}
-            },
-            'face_2': {
-                'facial_area': [200, 50, 300, 150],
-                'score': 0.92,
-                'landmarks': {}
-            }
-        }
+    @pytest.mark.parametrize("response,expected_count,detector_overrides", DETECTION_CASES)
+    def test_detect_faces(self, mock_retinaface, sample_face_image_path, detector,
+                          response, expected_count, detector_overrides):
+        """Test filtering and error handling for various RetinaFace responses."""
+        if isinstance(response, Exception):
+            mock_retinaface.side_effect = response
+        else:
+            mock_retinaface.return_value = response
+        for attr, value in detector_overrides.items():
+            setattr(detector, attr, value)
         
-        detector = FaceDetector()
         faces = detector.detect_faces(sample_face_image_path)
         
-        assert len(faces) == 2
+        assert len(faces) == expected_count
         assert all(face['score'] >= detector.confidence_threshold for face in faces)
     
-    @patch('app.face_detection.RetinaFace.detect_faces')
-    def test_detect_faces_no_faces(self, mock_detect, sample_face_image_path):
-        """Test when no faces are detected."""
-        mock_detect.return_value = {}
-        
-        detector = FaceDetector()
-        faces = detector.detect_faces(sample_face_image_path)
-        
-        assert len(faces) == 0
-    
-    @patch('app.face_detection.RetinaFace.detect_faces')
-    def test_detect_faces_below_confidence_threshold(self, mock_detect, sample_face_image_path):
-        """Test filtering faces below confidence threshold."""
-        mock_detect.return_value = {
-            'face_1': {
-                'facial_area': [50, 50, 150, 150],
-                'score': 0.5,  # Below default threshold
-                'landmarks': {}
-            }
-        }
-        
-        detector = FaceDetector()
-        detector.confidence_threshold = 0.9
-        faces = detector.detect_faces(sample_face_image_path)
-        
-        assert len(faces) == 0
-    
-    @patch('app.face_detection.RetinaFace.detect_faces')
-    def test_detect_faces_too_small(self, mock_detect, sample_face_image_path):
-        """Test filtering faces that are too small."""
-        mock_detect.return_value = {
-            'face_1': {
-                'facial_area': [50, 50, 60, 60],  # 10x10 face
-                'score': 0.95,
-                'landmarks': {}
-            }
-        }
-        
-        detector = FaceDetector()
-        detector.min_face_size = 20
-        faces = detector.detect_faces(sample_face_image_path)
-        
-        assert len(faces) == 0
-    
-    @patch('app.face_detection.RetinaFace.detect_faces')
-    def test_detect_faces_invalid_response(self, mock_detect, sample_face_image_path):
-        """Test handling of invalid RetinaFace response."""
-        mock_detect.return_value = None
-        
-        detector = FaceDetector()
-        faces = detector.detect_faces(sample_face_image_path)
-        
-        assert len(faces) == 0
-    
-    @patch('app.face_detection.RetinaFace.detect_faces')
-    def test_detect_faces_exception(self, mock_detect, sample_face_image_path):
-        """Test exception handling during face detection."""
-        mock_detect.side_effect = Exception("Detection failed")
-        
-        detector = FaceDetector()
-        faces = detector.detect_faces(sample_face_image_path)
-        
-        assert len(faces) == 0
-    
-    def test_extract_face_success(self, sample_face_image_path):
+    def test_extract_face_success(self, sample_face_image_path, detector):
         """Test successful face extraction."""
-        detector = FaceDetector()
         bbox = [50, 50, 100, 100]
         
         face_img = detector.extract_face(sample_face_image_path, bbox)
@@ -143,9 +114,8 @@ class TestFaceDetector:
         assert face_img.shape[0] == 100  # height
         assert face_img.shape[1] == 100  # width
     
-    def test_extract_face_out_of_bounds(self, sample_face_image_path):
+    def test_extract_face_out_of_bounds(self, sample_face_image_path, detector):
         """Test face extraction with out-of-bounds coordinates."""
-        detector = FaceDetector()
         # Bbox extends beyond image boundaries
         bbox = [150, 150, 200, 200]  # Image is 200x200
         
@@ -156,9 +126,8 @@ class TestFaceDetector:
         assert face_img.shape[0] <= 200
         assert face_img.shape[1] <= 200
     
-    def test_extract_face_negative_coordinates(self, sample_face_image_path):
+    def test_extract_face_negative_coordinates(self, sample_face_image_path, detector):
         """Test face extraction with negative coordinates."""
-        detector = FaceDetector()
         bbox = [-10, -10, 50, 50]
         
         face_img = detector.extract_face(sample_face_image_path, bbox)
@@ -166,68 +135,10 @@ class TestFaceDetector:
         assert face_img is not None
         # Coordinates should be clipped to 0
     
-    def test_extract_face_invalid_image(self):
+    def test_extract_face_invalid_image(self, detector):
         """Test face extraction from invalid image path."""
-        detector = FaceDetector()
         bbox = [50, 50, 100, 100]
         
         face_img = detector.extract_face("/nonexistent/path.jpg", bbox)
         
         assert face_img is None
-    
-    @patch('app.face_detection.RetinaFace.detect_faces')
-    def test_detect_faces_with_landmarks(self, mock_detect, sample_face_image_path):
-        """Test that landmarks are preserved in detection results."""
-        landmarks = {
-            'left_eye': [75, 85],
-            'right_eye': [125, 85],
-            'nose': [100, 100],
-            'mouth_left': [85, 115],
-            'mouth_right': [115, 115]
-        }
-        
-        mock_detect.return_value = {
-            'face_1': {
-                'facial_area': [50, 50, 150, 150],
-                'score': 0.95,
-                'landmarks': landmarks
-            }
-        }
-        
-        detector = FaceDetector()
-        faces = detector.detect_faces(sample_face_image_path)
-        
-        assert len(faces) == 1
-        assert faces[0]['landmarks'] == landmarks
-    
-    @patch('app.face_detection.RetinaFace.detect_faces')
-    def test_detect_faces_missing_facial_area(self, mock_detect, sample_face_image_path):
-        """Test handling of detection result without facial_area."""
-        mock_detect.return_value = {
-            'face_1': {
-                'score': 0.95,
-                'landmarks': {}
-            }
-        }
-        
-        detector = FaceDetector()
-        faces = detector.detect_faces(sample_face_image_path)
-        
-        # Should handle gracefully and skip this face
-        assert len(faces) == 0
-    
-    @patch('app.face_detection.RetinaFace.detect_faces')
-    def test_detect_faces_invalid_facial_area_format(self, mock_detect, sample_face_image_path):
-        """Test handling of invalid facial_area format."""
-        mock_detect.return_value = {
-            'face_1': {
-                'facial_area': [50, 50],  # Invalid format (should be 4 values)
-                'score': 0.95,
-                'landmarks': {}
-            }
-        }
-        
-        detector = FaceDetector()
-        faces = detector.detect_faces(sample_face_image_path)
-        
-        assert len(faces) == 0
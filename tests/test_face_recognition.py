@@ -9,30 +9,31 @@ Tests the FaceRecognizer class including:
 """
 import pytest
 import numpy as np
-from unittest.mock import patch, MagicMock
 import pickle
 
 from app.face_recognition import FaceRecognizer
 
 
+def _raise_model_failed(*args, **kwargs):
+    raise RuntimeError("Model failed")
+
+
 @pytest.mark.unit
+@pytest.mark.xdist_group("face_recognition")
 class TestFaceRecognizer:
     """Test suite for FaceRecognizer class."""
     
-    def test_init(self):
+    def test_init(self, recognizer):
         """Test FaceRecognizer initialization."""
-        recognizer = FaceRecognizer()
         assert recognizer.model_name == "ArcFace"
         assert recognizer.embedding_size == 512
     
-    @patch('app.face_recognition.DeepFace.represent')
-    def test_generate_embedding_success(self, mock_represent, sample_face_image_path):
+    def test_generate_embedding_success(self, mock_deepface_represent, sample_face_image_path, recognizer, rng):
         """Test successful embedding generation."""
         # Mock DeepFace response
-        mock_embedding = np.random.randn(512).astype(np.float32)
-        mock_represent.return_value = [{"embedding": mock_embedding.tolist()}]
+        mock_embedding = rng.standard_normal(512, dtype=np.float32)
+        mock_deepface_represent.return_value = [{"embedding": mock_embedding.tolist()}]
         
-        recognizer = FaceRecognizer()
         embedding = recognizer.generate_embedding(sample_face_image_path)
         
         assert embedding is not None
@@ -41,20 +42,17 @@ class TestFaceRecognizer:
         # Check that embedding is normalized
         assert np.isclose(np.linalg.norm(embedding), 1.0, atol=1e-5)
     
-    @patch('app.face_recognition.DeepFace.represent')
-    @patch('app.face_recognition.cv2.imread')
-    @patch('app.face_recognition.cv2.imwrite')
-    def test_generate_embedding_with_bbox(self, mock_imwrite, mock_imread, mock_represent, sample_face_image_path):
+    def test_generate_embedding_with_bbox(self, mock_cv2_imwrite, mock_cv2_imread, mock_deepface_represent,
+                                          sample_face_image_path, recognizer, rng):
         """Test embedding generation with bounding box."""
         # Mock image reading
         mock_image = np.zeros((200, 200, 3), dtype=np.uint8)
-        mock_imread.return_value = mock_image
+        mock_cv2_imread.return_value = mock_image
         
         # Mock DeepFace response
-        mock_embedding = np.random.randn(512).astype(np.float32)
-        mock_represent.return_value = [{"embedding": mock_embedding.tolist()}]
+        mock_embedding = rng.standard_normal(512, dtype=np.float32)
+        mock_deepface_represent.return_value = [{"embedding": mock_embedding.tolist()}]
         
-        recognizer = FaceRecognizer()
         bbox = [50, 50, 100, 100]
         embedding = recognizer.generate_embedding(sample_face_image_path, bbox=bbox)
         
@@ -62,36 +60,35 @@ class TestFaceRecognizer:
         assert isinstance(embedding, np.ndarray)
         assert embedding.shape == (512,)
         # Verify that image was cropped and saved
-        mock_imwrite.assert_called_once()
+        mock_cv2_imwrite.assert_called_once()
     
-    @patch('app.face_recognition.DeepFace.represent')
-    def test_generate_embedding_no_result(self, mock_represent, sample_face_image_path):
+    def test_generate_embedding_no_result(self, mock_deepface_represent, sample_face_image_path, recognizer):
         """Test when no embedding is generated."""
-        mock_represent.return_value = []
+        mock_deepface_represent.return_value = []
         
-        recognizer = FaceRecognizer()
         embedding = recognizer.generate_embedding(sample_face_image_path)
         
         assert embedding is None
     
-    @patch('app.face_recognition.DeepFace.represent')
-    def test_generate_embedding_exception(self, mock_represent, sample_face_image_path):
+    def test_generate_embedding_exception(self, monkeypatch, sample_face_image_path, recognizer):
         """Test exception handling during embedding generation."""
-        mock_represent.side_effect = Exception("Model failed")
+        monkeypatch.setattr("app.face_recognition.DeepFace.represent", _raise_model_failed)
         
-        recognizer = FaceRecognizer()
         embedding = recognizer.generate_embedding(sample_face_image_path)
         
         assert embedding is None
     
-    def test_calculate_similarity(self, sample_embedding):
+    def test_calculate_similarity(self, sample_embedding, recognizer, rng):
         """Test similarity calculation between embeddings."""
-        recognizer = FaceRecognizer()
-        
         # Create two similar embeddings
         embedding1 = sample_embedding
-        embedding2 = sample_embedding + np.random.randn(512) * 0.1
-        embedding2 = embedding2 / np.linalg.norm(embedding2)
+        embedding2 = np.empty(512, dtype=np.float32)
+        rng.standard_normal(dtype=np.float32, out=embedding2)
+        # sample_embedding has unit norm, so per-dimension noise of 0.01 has a
+        # total norm of ~0.23 (similarity ~0.97); 0.1 would drown it out
+        embedding2 *= 0.01
+        embedding2 += sample_embedding
+        embedding2 /= np.linalg.norm(embedding2)
         
         similarity = recognizer.calculate_similarity(embedding1, embedding2)
         
@@ -100,18 +97,14 @@ class TestFaceRecognizer:
         # Similar embeddings should have high similarity
         assert similarity > 0.5
     
-    def test_calculate_similarity_identical(self, sample_embedding):
+    def test_calculate_similarity_identical(self, sample_embedding, recognizer):
         """Test similarity of identical embeddings."""
-        recognizer = FaceRecognizer()
-        
         similarity = recognizer.calculate_similarity(sample_embedding, sample_embedding)
         
         assert np.isclose(similarity, 1.0, atol=1e-5)
     
-    def test_calculate_similarity_orthogonal(self):
+    def test_calculate_similarity_orthogonal(self, recognizer):
         """Test similarity of orthogonal embeddings."""
-        recognizer = FaceRecognizer()
-        
         # Create orthogonal embeddings
         embedding1 = np.zeros(512)
         embedding1[0] = 1.0
@@ -122,20 +115,16 @@ class TestFaceRecognizer:
         
         assert np.isclose(similarity, 0.0, atol=1e-5)
     
-    def test_calculate_similarity_exception(self, sample_embedding):
+    def test_calculate_similarity_exception(self, sample_embedding, recognizer):
         """Test exception handling in similarity calculation."""
-        recognizer = FaceRecognizer()
-        
         # Pass invalid data
         similarity = recognizer.calculate_similarity(sample_embedding, None)
         
         # Should return 0.0 on error
         assert similarity == 0.0
     
-    def test_find_similar_faces(self, sample_embedding, sample_embeddings_dict):
+    def test_find_similar_faces(self, sample_embedding, sample_embeddings_dict, recognizer):
         """Test finding similar faces from a collection."""
-        recognizer = FaceRecognizer()
-        
         # Add query embedding to dict for testing
         sample_embeddings_dict[99] = sample_embedding
         
@@ -152,10 +141,8 @@ class TestFaceRecognizer:
         if len(matches) > 1:
             assert matches[0][1] >= matches[1][1]
     
-    def test_find_similar_faces_with_high_threshold(self, sample_embedding, sample_embeddings_dict):
+    def test_find_similar_faces_with_high_threshold(self, sample_embedding, sample_embeddings_dict, recognizer):
         """Test finding similar faces with high threshold."""
-        recognizer = FaceRecognizer()
-        
         matches = recognizer.find_similar_faces(
             sample_embedding,
             sample_embeddings_dict,
@@ -165,10 +152,8 @@ class TestFaceRecognizer:
         # With random embeddings and high threshold, should find few or no matches
         assert isinstance(matches, list)
     
-    def test_find_similar_faces_empty_dict(self, sample_embedding):
+    def test_find_similar_faces_empty_dict(self, sample_embedding, recognizer):
         """Test finding similar faces with empty dictionary."""
-        recognizer = FaceRecognizer()
-        
         matches = recognizer.find_similar_faces(
             sample_embedding,
             {},
@@ -177,10 +162,8 @@ class TestFaceRecognizer:
         
         assert matches == []
     
-    def test_find_similar_faces_returns_tuples(self, sample_embedding, sample_embeddings_dict):
+    def test_find_similar_faces_returns_tuples(self, sample_embedding, sample_embeddings_dict, recognizer):
         """Test that find_similar_faces returns proper tuples."""
-        recognizer = FaceRecognizer()
-        
         matches = recognizer.find_similar_faces(
             sample_embedding,
             sample_embeddings_dict,
@@ -192,13 +175,46 @@ class TestFaceRecognizer:
             assert len(match) == 2
             assert isinstance(match[0], int)  # face_id
             assert isinstance(match[1], (float, np.floating))  # similarity
+        
+        similarities = [similarity for _, similarity in matches]
+        assert similarities == sorted(similarities, reverse=True)
+    
+    def test_find_similar_faces_mismatched_dimensions(self, sample_embedding, recognizer):
+        """Test that embeddings of another dimension score 0.0 instead of raising."""
+        embeddings_dict = {
+            1: sample_embedding,
+            2: np.ones(128, dtype=np.float32),
+        }
+        
+        matches = recognizer.find_similar_faces(sample_embedding, embeddings_dict, threshold=0.0)
+        
+        assert dict(matches) == pytest.approx({1: 1.0, 2: 0.0}, abs=1e-5)
+        assert recognizer.find_similar_faces(sample_embedding, embeddings_dict, threshold=0.5) == [
+            (1, pytest.approx(1.0, abs=1e-5))
+        ]
+    
+    def test_find_similar_faces_batched_matches_dict_version(self, sample_embedding, sample_embeddings_dict,
+                                                             sample_embeddings_matrix, recognizer):
+        """Test the batched search returns the top-k of find_similar_faces."""
+        expected = recognizer.find_similar_faces(sample_embedding, sample_embeddings_dict, threshold=-1.0)
+        
+        matches = recognizer.find_similar_faces_batched(
+            sample_embedding,
+            sample_embeddings_matrix,
+            list(sample_embeddings_dict),
+            threshold=-1.0,
+            k=3
+        )
+        
+        assert [face_id for face_id, _ in matches] == [face_id for face_id, _ in expected[:3]]
+        assert np.allclose([s for _, s in matches], [s for _, s in expected[:3]])
     
     def test_serialize_embedding(self, sample_embedding):
         """Test embedding serialization."""
         embedding_bytes = FaceRecognizer.serialize_embedding(sample_embedding)
         
         assert isinstance(embedding_bytes, bytes)
-        assert len(embedding_bytes) > 0
+        assert len(embedding_bytes) == 512 * 4
     
     def test_deserialize_embedding(self, sample_embedding):
         """Test embedding deserialization."""
@@ -212,6 +228,14 @@ class TestFaceRecognizer:
         assert restored_embedding.shape == sample_embedding.shape
         np.testing.assert_array_equal(restored_embedding, sample_embedding)
     
+    def test_deserialize_legacy_pickled_embedding(self, sample_embedding):
+        """Test that embeddings stored as pickles by older versions still load."""
+        legacy_bytes = pickle.dumps(sample_embedding.astype(np.float64))
+        
+        restored = FaceRecognizer.deserialize_embedding(legacy_bytes)
+        
+        np.testing.assert_array_almost_equal(restored, sample_embedding)
+    
     def test_serialize_deserialize_roundtrip(self, sample_embedding):
         """Test full serialization-deserialization cycle."""
         # Roundtrip
@@ -221,37 +245,32 @@ class TestFaceRecognizer:
         # Should be identical
         np.testing.assert_array_almost_equal(restored, sample_embedding)
     
-    @patch('app.face_recognition.cv2.imread')
-    def test_generate_embedding_bbox_invalid_image(self, mock_imread, sample_face_image_path):
+    def test_generate_embedding_bbox_invalid_image(self, mock_cv2_imread, sample_face_image_path, recognizer):
         """Test embedding generation with bbox when image cannot be read."""
-        mock_imread.return_value = None
+        mock_cv2_imread.return_value = None
         
-        recognizer = FaceRecognizer()
         bbox = [50, 50, 100, 100]
         embedding = recognizer.generate_embedding(sample_face_image_path, bbox=bbox)
         
         assert embedding is None
     
-    def test_calculate_similarity_different_dimensions(self):
+    def test_calculate_similarity_different_dimensions(self, recognizer, rng):
         """Test similarity calculation with different dimension embeddings."""
-        recognizer = FaceRecognizer()
-        
-        embedding1 = np.random.randn(512)
-        embedding1 = embedding1 / np.linalg.norm(embedding1)
-        embedding2 = np.random.randn(256)  # Wrong dimension
-        embedding2 = embedding2 / np.linalg.norm(embedding2)
+        embedding1 = rng.standard_normal(512, dtype=np.float32)
+        embedding1 /= np.linalg.norm(embedding1)
+        embedding2 = rng.standard_normal(256, dtype=np.float32)  # Wrong dimension
+        embedding2 /= np.linalg.norm(embedding2)
         
         similarity = recognizer.calculate_similarity(embedding1, embedding2)
         
         # Should handle error and return 0.0
         assert similarity == 0.0
     
-    def test_embedding_normalization(self):
+    def test_embedding_normalization(self, recognizer, rng):
         """Test that generated embeddings are properly normalized."""
-        recognizer = FaceRecognizer()
-        
         # Create an unnormalized embedding
-        unnormalized = np.random.randn(512) * 100  # Large values
+        unnormalized = rng.standard_normal(512, dtype=np.float32)
+        unnormalized *= 100  # Large values
         
         # Normalize it manually
         normalized = unnormalized / np.linalg.norm(unnormalized)
@@ -7,213 +7,167 @@ Tests pagination and filtering including:
 - Sorting
 - Edge cases
 """
+import asyncio
+from datetime import datetime, timedelta
+
 import pytest
+from sqlalchemy import delete, insert
+
+models_core = pytest.importorskip("app.models_core", reason="Core API not available")
+Person, Face = models_core.Person, models_core.Face
+
+# Request URL templates
+PERSONS_PAGE_URL = "/persons?skip={skip}&limit={limit}"
+FACES_PAGE_URL = "/faces?skip={skip}&limit={limit}"
+FACES_BY_PERSON_URL = "/faces?person_id={person_id}"
+
+# Mock embeddings shared by every test (never mutated)
+_IDX_EMB = [[float(i)] * 512 for i in range(32)]
+
+
+# Class-scoped seed data: committed once with a single executemany INSERT, so it
+# sits below each test's rolled-back SAVEPOINT, and deleted when the class ends.
+
+@pytest.fixture(scope="class")
+def persons_30(test_db_engine):
+    """30 persons named "Person 000".."Person 029"."""
+    with test_db_engine.begin() as conn:
+        conn.execute(insert(Person), [{"name": f"Person {i:03d}"} for i in range(30)])
+    yield 30
+    with test_db_engine.begin() as conn:
+        conn.execute(delete(Person))
+
+
+@pytest.fixture(scope="class")
+def faces_30(test_db_engine, face_rows):
+    """30 faces without a person."""
+    with test_db_engine.begin() as conn:
+        conn.execute(insert(Face), face_rows(30))
+    yield 30
+    with test_db_engine.begin() as conn:
+        conn.execute(delete(Face))
+
+
+@pytest.fixture(scope="class")
+def mixed_persons(test_db_engine):
+    """Persons with a handful of distinct, unsorted names."""
+    names = ["Charlie", "Alice", "Bob", "Alice Smith"]
+    with test_db_engine.begin() as conn:
+        conn.execute(insert(Person), [{"name": name} for name in names])
+    yield names
+    with test_db_engine.begin() as conn:
+        conn.execute(delete(Person))
 
-try:
-    from app.models_core import Person, Face
-    CORE_MODELS_AVAILABLE = True
-except ImportError:
-    CORE_MODELS_AVAILABLE = False
+
+@pytest.fixture(scope="class")
+def person_with_faces_20(test_db_engine, face_rows):
+    """A person owning 20 faces; yields the person's id."""
+    with test_db_engine.begin() as conn:
+        person_id = conn.execute(
+            insert(Person).returning(Person.id), {"name": "Filter Test"}
+        ).scalar_one()
+        conn.execute(insert(Face), face_rows(20, person_id))
+    yield person_id
+    with test_db_engine.begin() as conn:
+        conn.execute(delete(Face))
+        conn.execute(delete(Person))
 
 
 @pytest.mark.integration
-@pytest.mark.skipif(not CORE_MODELS_AVAILABLE, reason="Core API not available")
+@pytest.mark.xdist_group("pagination")
+@pytest.mark.usefixtures("persons_30", "faces_30")
 class TestPagination:
     """Test suite for pagination."""
     
-    def test_persons_pagination_default(self, core_client, test_db_session):
-        """Test default pagination for persons list."""
-        # Create 25 persons
-        for i in range(25):
-            person = Person(name=f"Person {i}")
-            test_db_session.add(person)
-        test_db_session.commit()
-        
-        response = core_client.get("/persons")
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert isinstance(data, list)
-        # Default limit might vary
-        assert len(data) <= 100
-    
-    def test_persons_pagination_with_limit(self, core_client, test_db_session):
-        """Test pagination with custom limit."""
-        # Create 20 persons
-        for i in range(20):
-            person = Person(name=f"Person {i}")
-            test_db_session.add(person)
-        test_db_session.commit()
+    # (url, accepted status codes, min/max page length on 200) against persons_30
+    @pytest.mark.parametrize("url,status,min_len,max_len", [
+        ("/persons", (200,), 0, 100),  # default limit might vary
+        ("/persons?limit=5", (200,), 0, 5),
+        (PERSONS_PAGE_URL.format(skip=100, limit=10), (200,), 0, 0),  # skip beyond total
+        ("/persons?limit=0", (200, 422), 0, 0),
+        ("/persons?limit=10000", (200, 422), 30, 30),  # large limit returns everything
+    ], ids=["default", "limit", "skip-beyond-total", "limit-zero", "large-limit"])
+    def test_persons_pagination(self, core_client, url, status, min_len, max_len):
+        """Test skip/limit handling for the persons list."""
+        response = core_client.get(url)
         
-        response = core_client.get("/persons?limit=5")
+        assert response.status_code in status
         
-        assert response.status_code == 200
-        data = response.json()
-        assert len(data) <= 5
+        if response.status_code == 200:
+            data = response.json()
+            assert isinstance(data, list)
+            assert min_len <= len(data) <= max_len
     
-    def test_persons_pagination_with_skip(self, core_client, test_db_session):
+    @pytest.mark.asyncio
+    async def test_persons_pagination_with_skip(self, async_client):
         """Test pagination with skip parameter."""
-        # Create 15 persons
-        persons = []
-        for i in range(15):
-            person = Person(name=f"Person {i:02d}")
-            persons.append(person)
-            test_db_session.add(person)
-        test_db_session.commit()
-        
-        # Get first page
-        response1 = core_client.get("/persons?skip=0&limit=5")
+        # Get first and second page concurrently
+        response1, response2 = await asyncio.gather(
+            async_client.get(PERSONS_PAGE_URL.format(skip=0, limit=5)),
+            async_client.get(PERSONS_PAGE_URL.format(skip=5, limit=5)),
+        )
         assert response1.status_code == 200
-        page1 = response1.json()
-        
-        # Get second page
-        response2 = core_client.get("/persons?skip=5&limit=5")
         assert response2.status_code == 200
-        page2 = response2.json()
-        
-        # Pages should be different
-        page1_ids = [p["id"] for p in page1]
-        page2_ids = [p["id"] for p in page2]
         
-        # No overlap between pages
-        assert len(set(page1_ids) & set(page2_ids)) == 0
+        # Pages should be different: no overlap between pages
+        page1_ids = {p["id"] for p in response1.json()}
+        page2_ids = {p["id"] for p in response2.json()}
+        assert page1_ids.isdisjoint(page2_ids)
     
-    def test_persons_pagination_skip_beyond_total(self, core_client, test_db_session):
-        """Test pagination when skip exceeds total count."""
-        # Create 5 persons
-        for i in range(5):
-            person = Person(name=f"Person {i}")
-            test_db_session.add(person)
-        test_db_session.commit()
-        
-        # Skip beyond total
-        response = core_client.get("/persons?skip=100&limit=10")
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert len(data) == 0
-    
-    def test_persons_pagination_limit_zero(self, core_client):
-        """Test pagination with limit=0."""
-        response = core_client.get("/persons?limit=0")
-        
-        # Should handle gracefully
-        assert response.status_code in [200, 422]
-        
-        if response.status_code == 200:
-            data = response.json()
-            assert len(data) == 0
-    
-    def test_faces_pagination(self, core_client, test_db_session):
+    def test_faces_pagination(self, core_client):
         """Test pagination for faces list."""
-        # Create 30 faces
-        for i in range(30):
-            face = Face(
-                image_path=f"/path/{i}.jpg",
-                bbox_x=i*10, bbox_y=i*10, bbox_width=100, bbox_height=100,
-                confidence=0.9,
-                embedding=[float(i)] * 512
-            )
-            test_db_session.add(face)
-        test_db_session.commit()
-        
         # Test pagination
-        response = core_client.get("/faces?skip=10&limit=10")
+        response = core_client.get(FACES_PAGE_URL.format(skip=10, limit=10))
         
         assert response.status_code == 200
         data = response.json()
         assert len(data) <= 10
     
-    def test_pagination_consistency(self, core_client, test_db_session):
+    @pytest.mark.asyncio
+    async def test_pagination_consistency(self, async_client):
         """Test that pagination is consistent across multiple requests."""
-        # Create 20 persons
-        for i in range(20):
-            person = Person(name=f"Person {i:03d}")
-            test_db_session.add(person)
-        test_db_session.commit()
-        
-        # Request same page twice
-        response1 = core_client.get("/persons?skip=5&limit=5")
-        response2 = core_client.get("/persons?skip=5&limit=5")
+        # Request same page twice, concurrently
+        url = PERSONS_PAGE_URL.format(skip=5, limit=5)
+        response1, response2 = await asyncio.gather(async_client.get(url), async_client.get(url))
         
         assert response1.status_code == 200
         assert response2.status_code == 200
         
-        data1 = response1.json()
-        data2 = response2.json()
-        
         # Should return same results
-        ids1 = [p["id"] for p in data1]
-        ids2 = [p["id"] for p in data2]
-        assert ids1 == ids2
+        assert [p["id"] for p in response1.json()] == [p["id"] for p in response2.json()]
+
+
+@pytest.mark.integration
+class TestEmptyPagination:
+    """Test suite for pagination over an empty database."""
     
     def test_pagination_with_empty_database(self, core_client):
         """Test pagination with empty database."""
-        response = core_client.get("/persons?skip=0&limit=10")
+        response = core_client.get(PERSONS_PAGE_URL.format(skip=0, limit=10))
         
         assert response.status_code == 200
         data = response.json()
         assert data == []
-    
-    def test_large_limit_value(self, core_client, test_db_session):
-        """Test pagination with very large limit."""
-        # Create 10 persons
-        for i in range(10):
-            person = Person(name=f"Person {i}")
-            test_db_session.add(person)
-        test_db_session.commit()
-        
-        # Request with large limit
-        response = core_client.get("/persons?limit=10000")
-        
-        assert response.status_code in [200, 422]
-        
-        if response.status_code == 200:
-            data = response.json()
-            # Should return all persons (10)
-            assert len(data) == 10
 
 
 @pytest.mark.integration
-@pytest.mark.skipif(not CORE_MODELS_AVAILABLE, reason="Core API not available")
+@pytest.mark.xdist_group("pagination")
 class TestFiltering:
     """Test suite for filtering."""
     
-    def test_filter_persons_by_name(self, core_client, test_db_session):
+    @pytest.mark.usefixtures("mixed_persons")
+    def test_filter_persons_by_name(self, core_client):
         """Test filtering persons by name."""
-        # Create persons with different names
-        person1 = Person(name="Alice")
-        person2 = Person(name="Bob")
-        person3 = Person(name="Alice Smith")
-        test_db_session.add_all([person1, person2, person3])
-        test_db_session.commit()
-        
         # Try to filter (if endpoint supports it)
         response = core_client.get("/persons?name=Alice")
         
         # Filtering might not be implemented
         assert response.status_code in [200, 404, 422]
     
-    def test_filter_faces_by_person_id(self, core_client, test_db_session):
+    def test_filter_faces_by_person_id(self, core_client, person_with_faces_20):
         """Test filtering faces by person_id."""
-        person = Person(name="Test Person")
-        test_db_session.add(person)
-        test_db_session.commit()
-        
-        # Create faces for this person
-        for i in range(3):
-            face = Face(
-                image_path=f"/path/{i}.jpg",
-                bbox_x=i*10, bbox_y=i*10, bbox_width=100, bbox_height=100,
-                confidence=0.9,
-                embedding=[float(i)] * 512,
-                person_id=person.id
-            )
-            test_db_session.add(face)
-        test_db_session.commit()
-        
         # Try to filter faces by person
-        response = core_client.get(f"/faces?person_id={person.id}")
+        response = core_client.get(FACES_BY_PERSON_URL.format(person_id=person_with_faces_20))
         
         assert response.status_code in [200, 404, 422]
     
@@ -226,7 +180,7 @@ class TestFiltering:
                 image_path=f"/path/{i}.jpg",
                 bbox_x=i*10, bbox_y=i*10, bbox_width=100, bbox_height=100,
                 confidence=conf,
-                embedding=[float(i)] * 512
+                embedding=_IDX_EMB[i]
             )
             test_db_session.add(face)
         test_db_session.commit()
@@ -236,44 +190,23 @@ class TestFiltering:
         
         assert response.status_code in [200, 404, 422]
     
-    def test_combined_pagination_and_filtering(self, core_client, test_db_session):
+    def test_combined_pagination_and_filtering(self, core_client, person_with_faces_20):
         """Test combining pagination with filtering."""
-        person = Person(name="Filter Test")
-        test_db_session.add(person)
-        test_db_session.commit()
-        
-        # Create many faces for this person
-        for i in range(20):
-            face = Face(
-                image_path=f"/path/{i}.jpg",
-                bbox_x=i*10, bbox_y=i*10, bbox_width=100, bbox_height=100,
-                confidence=0.9,
-                embedding=[float(i)] * 512,
-                person_id=person.id
-            )
-            test_db_session.add(face)
-        test_db_session.commit()
-        
         # Combine filter and pagination
-        response = core_client.get(f"/faces?person_id={person.id}&skip=5&limit=5")
+        url = FACES_BY_PERSON_URL.format(person_id=person_with_faces_20) + "&skip=5&limit=5"
+        response = core_client.get(url)
         
         assert response.status_code in [200, 404, 422]
 
 
 @pytest.mark.integration
-@pytest.mark.skipif(not CORE_MODELS_AVAILABLE, reason="Core API not available")
+@pytest.mark.xdist_group("pagination")
 class TestSorting:
     """Test suite for sorting."""
     
-    def test_sort_persons_by_name(self, core_client, test_db_session):
+    @pytest.mark.usefixtures("mixed_persons")
+    def test_sort_persons_by_name(self, core_client):
         """Test sorting persons by name."""
-        # Create persons
-        names = ["Charlie", "Alice", "Bob"]
-        for name in names:
-            person = Person(name=name)
-            test_db_session.add(person)
-        test_db_session.commit()
-        
         # Try to sort
         response = core_client.get("/persons?sort=name")
         
@@ -287,25 +220,22 @@ class TestSorting:
     
     def test_sort_persons_by_created_at(self, core_client, test_db_session):
         """Test sorting persons by creation date."""
-        # Create persons
-        for i in range(3):
-            person = Person(name=f"Person {i}")
-            test_db_session.add(person)
-            test_db_session.commit()  # Commit individually for different timestamps
+        # Create persons with distinct timestamps in a single INSERT
+        now = datetime.utcnow()
+        test_db_session.execute(insert(Person), [
+            {"name": f"Person {i}", "created_at": now + timedelta(microseconds=i)}
+            for i in range(3)
+        ])
+        test_db_session.commit()
         
         # Try to sort
         response = core_client.get("/persons?sort=created_at")
         
         assert response.status_code in [200, 404, 422]
     
-    def test_sort_descending_order(self, core_client, test_db_session):
+    @pytest.mark.usefixtures("mixed_persons")
+    def test_sort_descending_order(self, core_client):
         """Test sorting in descending order."""
-        # Create persons
-        for i in range(5):
-            person = Person(name=f"Person {i}")
-            test_db_session.add(person)
-        test_db_session.commit()
-        
         # Try descending sort
         response = core_client.get("/persons?sort=id&order=desc")
         
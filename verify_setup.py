@@ -3,22 +3,32 @@ Verify that the project is set up correctly
 """
 import sys
 import os
+from importlib.metadata import version, PackageNotFoundError
 
 def check_python_version():
     """Check Python version"""
-    version = sys.version_info
-    if version.major < 3 or (version.major == 3 and version.minor < 8):
+    py = sys.version_info
+    if py.major < 3 or (py.major == 3 and py.minor < 8):
         print("❌ Python 3.8+ required")
         return False
-    print(f"✅ Python {version.major}.{version.minor}.{version.micro}")
+    print(f"✅ Python {py.major}.{py.minor}.{py.micro}")
     return True
 
+def _list_dir(path):
+    """Return the entry names in a directory (empty if it can't be read)"""
+    try:
+        with os.scandir(path) as it:
+            return {entry.name for entry in it}
+    except OSError:
+        return set()
+
 def check_directories():
     """Check required directories exist"""
     dirs = ["uploads", "models", "app", "tests"]
+    top = _list_dir(".")
     all_exist = True
     for d in dirs:
-        if os.path.exists(d):
+        if d in top:
             print(f"✅ Directory '{d}' exists")
         else:
             print(f"❌ Directory '{d}' missing")
@@ -34,9 +44,15 @@ def check_files():
         "app/config.py",
         "app/database.py"
     ]
+    # One directory read per parent instead of one stat per file
+    listings = {}
     all_exist = True
     for f in files:
-        if os.path.exists(f):
+        parent, _, name = f.rpartition("/")
+        parent = parent or "."
+        if parent not in listings:
+            listings[parent] = _list_dir(parent)
+        if name in listings[parent]:
             print(f"✅ File '{f}' exists")
         else:
             print(f"❌ File '{f}' missing")
@@ -45,17 +61,17 @@ def check_files():
 
 def check_dependencies():
     """Check if key dependencies are installed"""
+    # Read the installed distribution metadata rather than importing the
+    # packages, which would pull in starlette, pydantic, click, ...
     try:
-        import fastapi
-        print(f"✅ FastAPI {fastapi.__version__}")
-    except ImportError:
+        print(f"✅ FastAPI {version('fastapi')}")
+    except PackageNotFoundError:
         print("❌ FastAPI not installed")
         return False
     
     try:
-        import uvicorn
-        print("✅ Uvicorn installed")
-    except ImportError:
+        print(f"✅ Uvicorn {version('uvicorn')}")
+    except PackageNotFoundError:
         print("❌ Uvicorn not installed")
         return False
     